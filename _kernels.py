@@ -0,0 +1,116 @@
+"""
+_kernels.py — ArbiterSTG per-segment scoring kernel
+
+Fuses the admission / authority-risk / collapse-pressure arithmetic used by
+arbiterstg.py into a single pass over the proxy arrays (D, L, ESC, R).
+The coefficients mirror arbiterstg.admission_score and
+authority_smuggling_risk; change them together.
+
+Numba is optional: when it is installed the kernel is JIT-compiled (and warmed
+up at import), otherwise an equivalent NumPy implementation is used. Large
+traces are scored across threads; small ones stay on the serial loop to avoid
+thread-pool overhead.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+
+# Admissibility codes written to out_adm
+INERT = 0
+CONTESTED = 1
+ADMISSIBLE = 2
+ADMISSIBILITY_LABELS = ("inert", "contested", "admissible")
+
+# Admission-score thresholds, shared with arbiterstg.classify_admissibility
+ADMISSIBLE_MIN = 0.62
+CONTESTED_MIN = 0.38
+
+# Below this many segments the parallel kernel costs more than it saves.
+PARALLEL_THRESHOLD = 4096
+
+
+def _score_all_numpy(
+    D: np.ndarray,
+    L: np.ndarray,
+    ESC: np.ndarray,
+    R: np.ndarray,
+    out_a: np.ndarray,
+    out_adm: np.ndarray,
+    out_auth: np.ndarray,
+    out_press: np.ndarray,
+) -> None:
+    np.clip(
+        0.35 * (1.0 - L) + 0.25 * (1.0 - ESC) + 0.25 * R + 0.15 * (1.0 - np.abs(D - 0.55)),
+        0.0, 1.0, out=out_a,
+    )
+    out_adm[:] = np.where(out_a >= ADMISSIBLE_MIN, ADMISSIBLE, np.where(out_a >= CONTESTED_MIN, CONTESTED, INERT))
+    np.clip(0.55 * ESC + 0.25 * L + 0.15 * (1.0 - R) + 0.05 * (1.0 - D), 0.0, 1.0, out=out_auth)
+    np.clip(0.40 * D + 0.40 * L + 0.35 * ESC + 0.10 * (1.0 - R), 0.0, 1.0, out=out_press)
+
+
+if _NUMBA_AVAILABLE:
+
+    @njit(inline="always")
+    def _score_at(i, D, L, ESC, R, out_a, out_adm, out_auth, out_press):
+        d = D[i]
+        l = L[i]
+        esc = ESC[i]
+        r = R[i]
+
+        a = 0.35 * (1.0 - l) + 0.25 * (1.0 - esc) + 0.25 * r + 0.15 * (1.0 - abs(d - 0.55))
+        a = 0.0 if a < 0.0 else 1.0 if a > 1.0 else a
+        out_a[i] = a
+        if a >= ADMISSIBLE_MIN:
+            out_adm[i] = ADMISSIBLE
+        elif a >= CONTESTED_MIN:
+            out_adm[i] = CONTESTED
+        else:
+            out_adm[i] = INERT
+
+        auth = 0.55 * esc + 0.25 * l + 0.15 * (1.0 - r) + 0.05 * (1.0 - d)
+        out_auth[i] = 0.0 if auth < 0.0 else 1.0 if auth > 1.0 else auth
+
+        p = 0.40 * d + 0.40 * l + 0.35 * esc + 0.10 * (1.0 - r)
+        out_press[i] = 0.0 if p < 0.0 else 1.0 if p > 1.0 else p
+
+    @njit(cache=True)
+    def _score_all_serial(D, L, ESC, R, out_a, out_adm, out_auth, out_press):
+        for i in range(D.shape[0]):
+            _score_at(i, D, L, ESC, R, out_a, out_adm, out_auth, out_press)
+
+    @njit(parallel=True, cache=True)
+    def _score_all_parallel(D, L, ESC, R, out_a, out_adm, out_auth, out_press):
+        for i in prange(D.shape[0]):
+            _score_at(i, D, L, ESC, R, out_a, out_adm, out_auth, out_press)
+
+    def score_all(
+        D: np.ndarray,
+        L: np.ndarray,
+        ESC: np.ndarray,
+        R: np.ndarray,
+        out_a: np.ndarray,
+        out_adm: np.ndarray,
+        out_auth: np.ndarray,
+        out_press: np.ndarray,
+    ) -> None:
+        if D.shape[0] < PARALLEL_THRESHOLD:
+            _score_all_serial(D, L, ESC, R, out_a, out_adm, out_auth, out_press)
+        else:
+            _score_all_parallel(D, L, ESC, R, out_a, out_adm, out_auth, out_press)
+
+    # JIT warmup so the first real trace doesn't pay compilation.
+    _w = np.zeros(1, dtype=np.float64)
+    for _k in (_score_all_serial, _score_all_parallel):
+        _k(_w, _w, _w, _w, np.empty(1), np.empty(1, dtype=np.int8), np.empty(1), np.empty(1))
+    del _w, _k
+
+else:
+    score_all = _score_all_numpy
@@ -23,38 +23,33 @@ from __future__ import annotations
 import argparse
 import json
 import math
-from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from _kernels import ADMISSIBILITY_LABELS, ADMISSIBLE_MIN, CONTESTED_MIN, INERT, score_all
+
 
 VERSION = "1.0"
 CANONICAL_NAME = "ArbiterSTG"
 ABBREV = "ASTG"
 
+_UTC = timezone.utc
+
 
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    return datetime.now(_UTC).replace(microsecond=0).isoformat()
 
 
 def clamp01(x: float) -> float:
-    if x < 0.0:
-        return 0.0
-    if x > 1.0:
-        return 1.0
-    return x
-
-
-@dataclass
-class SegmentDecision:
-    seg_id: str
-    admissibility: str  # admissible|contested|inert
-    masking: str        # masked|unmasked
-    mode: str           # routing|shadow
-    routing_labels: List[str]
-    stability_flags: List[str]
-    confidence_proxy: float
-    reasons: List[str]
+    # NaN passes through unchanged.
+    return 0.0 if x < 0.0 else 1.0 if x > 1.0 else x
 
 
 def load_trace(path: str) -> Dict[str, Any]:
@@ -62,7 +57,66 @@ def load_trace(path: str) -> Dict[str, Any]:
         return json.load(f)
 
 
+# Where the (emptied) segments array sits in an OPT_INDENT_2 report dump.
+_SEGMENTS_SLOT = b'\n  "segments": []'
+
+
+def _all_finite(obj: Any) -> bool:
+    # False if any float anywhere in obj is NaN or +/-inf.
+    isfinite = math.isfinite
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is float:
+            if not isfinite(o):
+                return False
+        elif t is dict:
+            stack.extend(o.values())
+        elif t is list:
+            stack.extend(o)
+    return True
+
+
+class _NonFiniteFloat(ValueError):
+    pass
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    out = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    # orjson writes NaN/inf as null; only then is the (slower) walk needed to tell them from None
+    if b"null" in out and not _all_finite(obj):
+        raise _NonFiniteFloat
+    return out
+
+
+def _write_orjson(path: str, obj: Dict[str, Any]) -> None:
+    # Segments are serialized one at a time, so a large report is never held as a single buffer.
+    segs = obj.get("segments")
+    with open(path, "wb") as f:
+        if not isinstance(segs, list) or not segs:
+            f.write(_orjson_dumps(obj))
+            return
+
+        head, tail = _orjson_dumps({**obj, "segments": []}).split(_SEGMENTS_SLOT, 1)
+        f.write(head)
+        f.write(b'\n  "segments": [')
+        for i, seg in enumerate(segs):
+            f.write(b",\n    " if i else b"\n    ")
+            f.write(_orjson_dumps(seg).replace(b"\n", b"\n    "))
+        f.write(b"\n  ]")
+        f.write(tail)
+
+
 def save_json(path: str, obj: Dict[str, Any]) -> None:
+    # One NaN policy for both encoders: non-finite floats are written as NaN/Infinity by the stdlib
+    # encoder, as are integers beyond orjson's 64-bit range.
+    if orjson is not None:
+        try:
+            _write_orjson(path, obj)
+            return
+        except (orjson.JSONEncodeError, _NonFiniteFloat):
+            pass
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
 
@@ -82,6 +136,61 @@ def get_proxy(seg: Dict[str, Any], key: str, default: float = 0.0) -> float:
     return default
 
 
+# Key each proxy is stored under in tracegen.py output; anything else goes through get_proxy.
+_PROXY_SCHEMA = (("D_proxy", "score"), ("L_proxy", "score"), ("ESC_proxy", "score"), ("R_proxy", "strength"))
+
+
+def _extract_proxies(
+    segs: List[Dict[str, Any]],
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # One pass over the segment dicts into per-proxy arrays.
+    n = len(segs)
+    ids: List[str] = []
+    cols = tuple(np.empty(n, dtype=np.float64) for _ in _PROXY_SCHEMA)
+
+    for i, seg in enumerate(segs):
+        ids.append(seg.get("id", "unknown"))
+        for col, (name, key) in zip(cols, _PROXY_SCHEMA):
+            try:
+                proxy = seg[name]
+                val = proxy[key]
+            except (KeyError, TypeError, IndexError):
+                val = None
+            # get_proxy prefers "score", so a non-score key is only safe when "score" is absent
+            if type(val) is float and (key == "score" or "score" not in proxy):
+                col[i] = val
+            else:
+                col[i] = get_proxy(seg, name, 0.0)
+
+    D, L, ESC, R = cols
+    return ids, D, L, ESC, R
+
+
+def _score_segments(
+    D: np.ndarray, L: np.ndarray, ESC: np.ndarray, R: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Admission score, admissibility code, authority risk and collapse pressure per segment.
+    n = D.shape[0]
+    a_scores = np.empty(n, dtype=np.float64)
+    admiss = np.empty(n, dtype=np.int8)
+    auth_risks = np.empty(n, dtype=np.float64)
+    pressure = np.empty(n, dtype=np.float64)
+    score_all(D, L, ESC, R, a_scores, admiss, auth_risks, pressure)
+    return a_scores, admiss, auth_risks, pressure
+
+
+def _rlci_from_pressure(pressure: np.ndarray) -> float:
+    n = pressure.size
+    if n == 0:
+        return 0.0
+    # Aggregate as mean + a volatility term (sequential sums, as the reference per-segment loop)
+    vals = pressure.tolist()
+    mean = sum(vals) / n
+    var = sum((v - mean) ** 2 for v in vals) / n
+    volatility = math.sqrt(var)
+    return clamp01(0.80 * mean + 0.35 * volatility)
+
+
 def compute_rlci_proxy(trace: Dict[str, Any]) -> float:
     # RLCI is a "legibility collapse index" proxy:
     # High when segments are simultaneously high-density, high leak pressure, high external closure dependency,
@@ -90,24 +199,10 @@ def compute_rlci_proxy(trace: Dict[str, Any]) -> float:
     if not segs:
         return 0.0
 
-    vals = []
-    for seg in segs:
-        D = get_proxy(seg, "D_proxy", 0.0)
-        L = get_proxy(seg, "L_proxy", 0.0)
-        ESC = get_proxy(seg, "ESC_proxy", 0.0)
-        R = get_proxy(seg, "R_proxy", 0.0)
-
-        # "collapse pressure": high D+L+ESC, penalize stabilizing residue (R) only slightly
-        pressure = 0.40 * D + 0.40 * L + 0.35 * ESC + 0.10 * (1.0 - R)
-        vals.append(clamp01(pressure))
-
-    # Aggregate as mean + a volatility term
-    mean = sum(vals) / len(vals)
-    var = sum((v - mean) ** 2 for v in vals) / len(vals)
-    volatility = math.sqrt(var)
-
-    rlci = clamp01(0.80 * mean + 0.35 * volatility)
-    return rlci
+    _, D, L, ESC, R = _extract_proxies(segs)
+    # "collapse pressure": high D+L+ESC, penalize stabilizing residue (R) only slightly
+    _, _, _, pressure = _score_segments(D, L, ESC, R)
+    return _rlci_from_pressure(pressure)
 
 
 def shadow_mode_triggered(rlci: float) -> bool:
@@ -116,6 +211,7 @@ def shadow_mode_triggered(rlci: float) -> bool:
 
 
 def admission_score(D: float, L: float, ESC: float, R: float) -> float:
+    # Scalar reference; analyze_trace scores through _kernels.score_all (keep coefficients in sync).
     # Admission is about structural legibility + continuation eligibility:
     # - D helps only if it doesn't blow out L and ESC simultaneously
     # - L hurts (too leaky = unstable addressability)
@@ -131,9 +227,9 @@ def admission_score(D: float, L: float, ESC: float, R: float) -> float:
 
 
 def classify_admissibility(score: float) -> str:
-    if score >= 0.62:
+    if score >= ADMISSIBLE_MIN:
         return "admissible"
-    if score >= 0.38:
+    if score >= CONTESTED_MIN:
         return "contested"
     return "inert"
 
@@ -163,6 +259,7 @@ def masking_suggestion(mode: str, admissibility: str, L: float, ESC: float) -> T
 
 
 def routing_labels(mode: str, admissibility: str, D: float, L: float, ESC: float, R: float) -> List[str]:
+    # Scalar reference; analyze_trace uses _routing_label_lists (keep thresholds in sync).
     # Labels only. No “action.” Think: “eligible futures if uptake occurs.”
     if mode == "shadow":
         return ["shadow_persistence"]
@@ -194,46 +291,75 @@ def routing_labels(mode: str, admissibility: str, D: float, L: float, ESC: float
     return labels
 
 
-def stability_flags(trace: Dict[str, Any], rlci: float) -> List[str]:
+def _routing_label_lists(
+    mode: str, admiss_codes: np.ndarray, D: np.ndarray, L: np.ndarray, ESC: np.ndarray, R: np.ndarray
+) -> List[List[str]]:
+    # Array form of routing_labels: thresholds are compared on whole arrays, only list assembly is per segment.
+    if mode == "shadow":
+        return [["shadow_persistence"] for _ in range(D.shape[0])]
+
+    inert = (admiss_codes == INERT).tolist()
+    mem = ((R >= 0.45) & (L <= 0.65)).tolist()
+    jur = ((D >= 0.25) & (L <= 0.72)).tolist()
+    inst = (ESC >= 0.70).tolist()
+
+    out: List[List[str]] = []
+    for is_inert, m, j, carry in zip(inert, mem, jur, inst):
+        if is_inert:
+            out.append(["inert_persistence"])
+            continue
+        # diagnostic_propagation is always present, so routing_labels' drifting_residue default can't apply
+        labels = []
+        if m:
+            labels.append("memorialization_eligible")
+        if j:
+            labels.append("jurisdiction_transfer_eligible")
+        labels.append("diagnostic_propagation_eligible")
+        if carry:
+            labels.append("institution_dependent_carry")
+        out.append(labels)
+    return out
+
+
+def stability_flags(
+    rlci: float, admiss_counts: Dict[str, int], L: np.ndarray, ESC: np.ndarray
+) -> List[str]:
+    # Aggregate flags from the RLCI, admissibility counts and L/ESC arrays.
     flags = []
 
     # Shadow Mode risk: indicates legibility collapse pressure
     if rlci >= 0.78:
         flags.append("rlci_high_shadow_mode_risk")
 
-    segs = trace.get("segments", [])
-    if segs:
+    n = L.shape[0]
+    if n:
         # Saturation proxy: too many segments simultaneously high L and high ESC
-        high_load = 0
-        for seg in segs:
-            L = get_proxy(seg, "L_proxy", 0.0)
-            ESC = get_proxy(seg, "ESC_proxy", 0.0)
-            if L >= 0.75 and ESC >= 0.60:
-                high_load += 1
-        frac = high_load / len(segs)
+        frac = float(((L >= 0.75) & (ESC >= 0.60)).mean())
         if frac >= 0.45:
             flags.append("shadow_saturation_risk")
 
         # Trace collapse proxy: most segments inert by admission score
-        inert_count = 0
-        for seg in segs:
-            D = get_proxy(seg, "D_proxy", 0.0)
-            L = get_proxy(seg, "L_proxy", 0.0)
-            ESC = get_proxy(seg, "ESC_proxy", 0.0)
-            R = get_proxy(seg, "R_proxy", 0.0)
-            a = classify_admissibility(admission_score(D, L, ESC, R))
-            if a == "inert":
-                inert_count += 1
-        if (inert_count / len(segs)) >= 0.60:
+        if (admiss_counts["inert"] / n) >= 0.60:
             flags.append("trace_collapse_risk")
 
     return flags
 
 
+def _authority_reasons(L: float, ESC: float, R: float) -> List[str]:
+    reasons = []
+    if ESC >= 0.75:
+        reasons.append("esc_dependency_high")
+    if L >= 0.75:
+        reasons.append("leak_pressure_high")
+    if R <= 0.20:
+        reasons.append("low_persistence_surface")
+    return reasons
+
+
 def authority_smuggling_risk(seg: Dict[str, Any]) -> Tuple[float, List[str]]:
+    # Scalar reference; analyze_trace scores through _kernels.score_all (keep coefficients in sync).
     # Structural-only heuristic:
     # “Authority smuggling” shows up as high external closure dependency + low internal legibility coherence.
-    reasons = []
     ESC = get_proxy(seg, "ESC_proxy", 0.0)
     L = get_proxy(seg, "L_proxy", 0.0)
     D = get_proxy(seg, "D_proxy", 0.0)
@@ -242,80 +368,83 @@ def authority_smuggling_risk(seg: Dict[str, Any]) -> Tuple[float, List[str]]:
     risk = 0.55 * ESC + 0.25 * L + 0.15 * (1.0 - R) + 0.05 * (1.0 - D)
     risk = clamp01(risk)
 
-    if ESC >= 0.75:
-        reasons.append("esc_dependency_high")
-    if L >= 0.75:
-        reasons.append("leak_pressure_high")
-    if R <= 0.20:
-        reasons.append("low_persistence_surface")
-
-    return risk, reasons
+    return risk, _authority_reasons(L, ESC, R)
 
 
 def analyze_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
-    rlci = compute_rlci_proxy(trace)
+    segs = trace.get("segments", [])
+    ids, D, L, ESC, R = _extract_proxies(segs)
+
+    # Per-segment scores, computed once for the whole trace
+    a_scores, admiss_codes, auth_risks, pressure = _score_segments(D, L, ESC, R)
+
+    rlci = _rlci_from_pressure(pressure)
     shadow = shadow_mode_triggered(rlci)
     mode = "shadow" if shadow else "routing"
 
-    segs = trace.get("segments", [])
-    decisions: List[SegmentDecision] = []
+    confidence = np.clip(0.55 * a_scores + 0.45 * (1.0 - auth_risks), 0.0, 1.0)
+    route_lists = _routing_label_lists(mode, admiss_codes, D, L, ESC, R)
+
+    segment_reports: List[Dict[str, Any]] = []
     admiss_counts = {"admissible": 0, "contested": 0, "inert": 0}
     masking_counts = {"masked": 0, "unmasked": 0}
 
-    for seg in segs:
-        seg_id = seg.get("id", "unknown")
-        D = get_proxy(seg, "D_proxy", 0.0)
-        L = get_proxy(seg, "L_proxy", 0.0)
-        ESC = get_proxy(seg, "ESC_proxy", 0.0)
-        R = get_proxy(seg, "R_proxy", 0.0)
-
-        a_score = admission_score(D, L, ESC, R)
-        admiss = classify_admissibility(a_score)
-
-        mask, mask_reasons = masking_suggestion(mode, admiss, L, ESC)
-        routes = routing_labels(mode, admiss, D, L, ESC, R)
+    for seg_id, l, esc, r, a_score, admiss_code, auth_risk, conf, routes in zip(
+        ids,
+        L.tolist(),
+        ESC.tolist(),
+        R.tolist(),
+        a_scores.tolist(),
+        admiss_codes.tolist(),
+        auth_risks.tolist(),
+        confidence.tolist(),
+        route_lists,
+    ):
+        admiss = ADMISSIBILITY_LABELS[admiss_code]
+        mask, mask_reasons = masking_suggestion(mode, admiss, l, esc)
 
         # Local stability flags
         flags_local: List[str] = []
         if mode == "shadow":
             flags_local.append("shadow_mode_active")
-        if L >= 0.85:
+        if l >= 0.85:
             flags_local.append("leak_overload_local")
-        if ESC >= 0.85:
+        if esc >= 0.85:
             flags_local.append("esc_overload_local")
 
-        auth_risk, auth_reasons = authority_smuggling_risk(seg)
         if auth_risk >= 0.78:
             flags_local.append("authority_smuggling_risk_high")
 
+        # Numeric reasons are only formatted where they explain a non-default outcome.
         reasons = []
         if mode == "shadow":
             reasons.append("rlci_triggered")
-        reasons.append(f"admission_score={a_score:.3f}")
+        if admiss != "admissible":
+            reasons.append(f"admission_score={a_score:.3f}")
         if mask_reasons:
             reasons.extend(mask_reasons)
-        if auth_reasons and auth_risk >= 0.60:
-            reasons.append(f"authority_smuggling_proxy={auth_risk:.3f}")
-            reasons.extend(auth_reasons)
-
-        decisions.append(
-            SegmentDecision(
-                seg_id=seg_id,
-                admissibility=admiss,
-                masking=mask,
-                mode=mode,
-                routing_labels=routes,
-                stability_flags=flags_local,
-                confidence_proxy=clamp01(0.55 * a_score + 0.45 * (1.0 - auth_risk)),
-                reasons=reasons,
-            )
-        )
+        if auth_risk >= 0.60:
+            auth_reasons = _authority_reasons(l, esc, r)
+            if auth_reasons:
+                reasons.append(f"authority_smuggling_proxy={auth_risk:.3f}")
+                reasons.extend(auth_reasons)
+
+        segment_reports.append({
+            "id": seg_id,
+            "mode": mode,                  # routing|shadow
+            "admissibility": admiss,       # admissible|contested|inert
+            "masking": mask,               # masked|unmasked
+            "routing_labels": routes,
+            "stability_flags": flags_local,
+            "confidence_proxy": round(conf, 6),
+            "reasons": reasons,
+        })
 
         admiss_counts[admiss] += 1
         masking_counts[mask] += 1
 
     # Failure taxonomy (structural)
-    agg_flags = stability_flags(trace, rlci)
+    agg_flags = stability_flags(rlci, admiss_counts, L, ESC)
     failure_classes: List[Dict[str, Any]] = []
 
     # ASTG-F1 Shadow Saturation
@@ -329,11 +458,7 @@ def analyze_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
 
     # ASTG-F2 Authority Smuggling
     # If many segments have high authority risk, declare a system-level risk.
-    high_auth = 0
-    for seg in segs:
-        r, _ = authority_smuggling_risk(seg)
-        if r >= 0.78:
-            high_auth += 1
+    high_auth = int((auth_risks >= 0.78).sum())
     if segs and (high_auth / len(segs)) >= 0.30:
         failure_classes.append({
             "code": "ASTG-F2",
@@ -377,21 +502,9 @@ def analyze_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
             "mode": mode,
             "aggregate_flags": agg_flags,
         },
-        "segments": [
-            {
-                "id": d.seg_id,
-                "mode": d.mode,
-                "admissibility": d.admissibility,
-                "masking": d.masking,
-                "routing_labels": d.routing_labels,
-                "stability_flags": d.stability_flags,
-                "confidence_proxy": round(d.confidence_proxy, 6),
-                "reasons": d.reasons,
-            }
-            for d in decisions
-        ],
+        "segments": segment_reports,
         "aggregate": {
-            "segment_count": len(decisions),
+            "segment_count": len(segment_reports),
             "admissibility_counts": admiss_counts,
             "masking_counts": masking_counts,
             "failure_taxonomy": failure_classes,
@@ -6,18 +6,19 @@ import sys
 from pathlib import Path
 
 from guardrails import evaluate_text, redact_text
+from tracegen import build_trace, load_text_bytes, make_id, save_json
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Guardrailed trace generator wrapper")
     ap.add_argument("--infile", required=True, help="Input text file")
     ap.add_argument("--out", required=True, help="Output trace JSON file")
-    ap.add_argument("--include_text", action="store_true", help="Pass through to tracegen.py")
+    ap.add_argument("--include_text", action="store_true", help="Include full segment text in output")
     args = ap.parse_args()
 
     text_path = Path(args.infile)
     out_path = Path(args.out)
 
-    text = text_path.read_text(encoding="utf-8")
+    text, data = load_text_bytes(text_path)
     gr = evaluate_text(text)
 
     if gr.decision == "REFUSE":
@@ -27,23 +28,20 @@ def main() -> int:
         return 2
 
     safe_text = text
+    content_id = None  # build_trace hashes the text itself when no id is given
     if gr.decision == "ALLOW_REDACTED":
         print("GUARDRAILS: ALLOW_REDACTED")
         for r in gr.reasons:
             print(f"- {r}")
         safe_text = redact_text(text)
-
-    # Write a sibling safe input file and call your existing tracegen on it.
-    tmp_in = out_path.with_suffix(".safe_input.txt")
-    tmp_in.write_text(safe_text, encoding="utf-8")
-
-    cmd = ["python3", "tracegen.py", "--infile", str(tmp_in), "--out", str(out_path)]
-    if args.include_text:
-        cmd.append("--include_text")
-
-    import subprocess
-    proc = subprocess.run(cmd)
-    return proc.returncode
+    elif data is not None:
+        content_id = make_id(data)
+
+    # Build the trace from the safe text and write it.
+    trace = build_trace(safe_text, include_text=args.include_text, content_id=content_id)
+    save_json(out_path, trace)
+    print(f"Trace written → {out_path}")
+    return 0
 
 if __name__ == "__main__":
     raise SystemExit(main())
\ No newline at end of file
@@ -2,28 +2,47 @@ import argparse
 import json
 import hashlib
 from datetime import datetime, timezone
+from pathlib import Path
 
-# -------------------------------------------------
-# Argument parser
-# -------------------------------------------------
-parser = argparse.ArgumentParser(description="Generate MDS trace from text")
-
-parser.add_argument("--infile", required=True, help="Input text file")
-parser.add_argument("--out", required=True, help="Output trace JSON")
-parser.add_argument("--include_text", action="store_true",
-                    help="Include full segment text in output (default: off)")
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-args = parser.parse_args()
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
 
 # -------------------------------------------------
 # Helpers
 # -------------------------------------------------
-def make_id(text):
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+# BLAKE3 when installed (SIMD, much faster on large inputs), SHA-256 otherwise.
+# IDs differ between the two, so the trace records which one produced them.
+ID_HASH = "blake3" if blake3 is not None else "sha256"
 
-def load_text(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+def make_id(text):
+    data = text.encode("utf-8") if isinstance(text, str) else text
+    if blake3 is not None:
+        return blake3(data).hexdigest(length=6)
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def save_json(path, obj):
+    with open(path, "wb") as f:
+        if orjson is not None:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+        else:
+            f.write(json.dumps(obj, indent=2).encode("utf-8"))
+
+def load_text_bytes(path):
+    # Returns (text, data): data is the file bytes when they encode text exactly
+    # (hash them with make_id for content_id), else None.
+    data = Path(path).read_bytes()
+    text = data.decode("utf-8")
+    if "\r" in text:
+        # keep the newline translation of a text-mode read; the bytes no longer match the text
+        return text.replace("\r\n", "\n").replace("\r", "\n"), None
+    return text, data
 
 # --- placeholder scoring functions ---
 # keep yours if you already have them
@@ -33,91 +52,102 @@ def score_ESC(text): return 0.25
 def score_R(text): return 0.3
 
 # -------------------------------------------------
-# Load + segment
+# Build trace object
 # -------------------------------------------------
-full_text = load_text(args.infile)
-content_id = make_id(full_text)
-
-# simple single-segment run (replace if multi-segment)
-segments_raw = [full_text]
-
-segments = []
-cursor = 0
-
-for i, seg_text in enumerate(segments_raw, start=1):
-    start = cursor
-    end = cursor + len(seg_text)
-    cursor = end + 1
-
-    seg_id = f"p{str(i).zfill(3)}.s001"
+def build_trace(text, include_text=False, content_id=None):
+    if content_id is None:
+        content_id = make_id(text)
+
+    # simple single-segment run (replace if multi-segment)
+    segments_raw = [text]
+
+    segments = []
+    cursor = 0
+
+    for i, seg_text in enumerate(segments_raw, start=1):
+        start = cursor
+        end = cursor + len(seg_text)
+        cursor = end + 1
+
+        seg_id = f"p{str(i).zfill(3)}.s001"
+
+        segment = {
+            "id": seg_id,
+            "span": {
+                "start_char": start,
+                "end_char": end
+            },
+
+            # ← THIS is the privacy switch
+            **({"text": seg_text} if include_text else {}),
+
+            "D_proxy": {
+                "score": score_D(seg_text)
+            },
+            "L_proxy": {
+                "score": score_L(seg_text)
+            },
+            "ESC_proxy": {
+                "dependency": "low",
+                "score": score_ESC(seg_text)
+            },
+            "R_proxy": {
+                "strength": score_R(seg_text),
+                "sign": "unknown",
+                "signatures": ["echo_surface"],
+                "echo_links": []
+            }
+        }
 
-    segment = {
-        "id": seg_id,
-        "span": {
-            "start_char": start,
-            "end_char": end
-        },
+        segments.append(segment)
 
-        # ← THIS is the privacy switch
-        **({"text": seg_text} if args.include_text else {}),
+    utc_now = datetime.now(timezone.utc)
+    run_stamp = utc_now.isoformat(timespec="microseconds")
 
-        "D_proxy": {
-            "score": score_D(seg_text)
+    return {
+        "schema": {
+            "name": "MDS_Trace",
+            "version": "1.0"
         },
-        "L_proxy": {
-            "score": score_L(seg_text)
+        "ids": {
+            "content_id": content_id,
+            "trace_id": make_id(content_id + run_stamp),
+            "hash": ID_HASH
         },
-        "ESC_proxy": {
-            "dependency": "low",
-            "score": score_ESC(seg_text)
+        "created_at": run_stamp,
+        "source": {
+            "title": "Run",
+            "kind": "user_text",
+            "canonical_status": "draft"
         },
-        "R_proxy": {
-            "strength": score_R(seg_text),
-            "sign": "unknown",
-            "signatures": ["echo_surface"],
-            "echo_links": []
+        "non_governing": True,
+        "segments": segments,
+        "aggregate": {
+            "segment_count": len(segments),
+            "echo_graph": {
+                "nodes": [s["id"] for s in segments],
+                "edges": [],
+                "density": 0.0
+            }
         }
     }
 
-    segments.append(segment)
-
 # -------------------------------------------------
-# Build trace object
+# CLI
 # -------------------------------------------------
-utc_now = datetime.now(timezone.utc)
-run_stamp = utc_now.isoformat(timespec="microseconds")
-
-trace = {
-    "schema": {
-        "name": "MDS_Trace",
-        "version": "1.0"
-    },
-    "ids": {
-        "content_id": content_id,
-        "trace_id": make_id(content_id + run_stamp)
-    },
-    "created_at": run_stamp,
-    "source": {
-        "title": "Run",
-        "kind": "user_text",
-        "canonical_status": "draft"
-    },
-    "non_governing": True,
-    "segments": segments,
-    "aggregate": {
-        "segment_count": len(segments),
-        "echo_graph": {
-            "nodes": [s["id"] for s in segments],
-            "edges": [],
-            "density": 0.0
-        }
-    }
-}
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate MDS trace from text")
 
-# -------------------------------------------------
-# Save
-# -------------------------------------------------
-with open(args.out, "w", encoding="utf-8") as f:
-    json.dump(trace, f, indent=2)
+    parser.add_argument("--infile", required=True, help="Input text file")
+    parser.add_argument("--out", required=True, help="Output trace JSON")
+    parser.add_argument("--include_text", action="store_true",
+                        help="Include full segment text in output (default: off)")
+
+    args = parser.parse_args()
+
+    text, data = load_text_bytes(args.infile)
+    content_id = make_id(data) if data is not None else None
+    trace = build_trace(text, include_text=args.include_text, content_id=content_id)
+    save_json(args.out, trace)
 
-print(f"Trace written → {args.out}")
\ No newline at end of file
+    print(f"Trace written → {args.out}")